@@ -1,6 +1,8 @@
 import base64
+import cProfile
 import multiprocessing as mp
 import os
+import signal
 import sys
 import time
 import qrcode
@@ -83,28 +85,106 @@ class KeyGenerator:
         
         return {v.encode() for v in variants}
 
+# СТАДИИ ГОРЯЧЕГО ЦИКЛА ДЛЯ --profile
+STAGE_ENTROPY = 0
+STAGE_SCALARMULT = 1
+STAGE_BASE64 = 2
+STAGE_PREFIX = 3
+STAGE_COUNTER = 4
+
+PROFILE_STAGES = [
+    "utils.random (энтропия)",
+    "скалярное умножение",
+    "base64",
+    "цикл префиксов",
+    "блокировка счетчика",
+]
+
+# Сколько ждать завершения процессов при --profile/--profile-dump,
+# чтобы они успели сбросить замеры и записать cProfile
+PROFILE_JOIN_TIMEOUT = 10
+
+class StageProfiler:
+    """Выборочное профилирование стадий горячего цикла worker_process"""
+    
+    def __init__(self, stats: mp.Array):
+        # stats - общий массив: [время_нс, выборки] для каждой стадии
+        self.stats = stats
+        self.local = [0] * len(stats)
+    
+    def add(self, stage: int, elapsed_ns: int):
+        """Учет одного замера стадии (локально, без блокировок)"""
+        self.local[stage * 2] += elapsed_ns
+        self.local[stage * 2 + 1] += 1
+    
+    def flush(self):
+        """Перенос накопленных замеров в общую память"""
+        # Забираем замеры до записи, чтобы прерванный перенос
+        # не учел их повторно
+        local, self.local = self.local, [0] * len(self.local)
+        with self.stats.get_lock():
+            for i, value in enumerate(local):
+                self.stats[i] += value
+
 def worker_process(worker_id: int, target_prefixes_list: List[bytes], 
                    found_event: mp.Event, counter: mp.Value, result_queue: mp.Queue,
-                   strict_mode: bool = False):
+                   strict_mode: bool = False, profile_stats: Optional[mp.Array] = None,
+                   profile_every: int = 1000, profile_dump: Optional[str] = None):
     """Процесс-работник для генерации и проверки ключей"""
+    keys_checked = 0
+    profiler = StageProfiler(profile_stats) if profile_stats is not None else None
+    cprofile = None
+    if profile_dump:
+        cprofile = cProfile.Profile()
+        cprofile.enable()
+    
+    if profiler is not None or cprofile is not None:
+        # Ctrl+C обрабатывает главный процесс: он выставляет found_event,
+        # и работник успевает сбросить замеры в finally
+        signal.signal(signal.SIGINT, signal.SIG_IGN)
+    
     try:
-        keys_checked = 0
         decoded_prefixes = {p: p.decode() for p in target_prefixes_list}
         
         while not found_event.is_set():
+            # Замеряем только каждый profile_every-й ключ (первый, "холодный", пропускаем)
+            sampled = profiler is not None and keys_checked > 0 and keys_checked % profile_every == 0
+            
             # Генерируем пару ключей
-            private_key = utils.random(32)
-            public_key = public.PrivateKey(private_key).public_key
-            public_b64 = base64.b64encode(bytes(public_key))
+            if sampled:
+                t0 = time.perf_counter_ns()
+                private_key = utils.random(32)
+                t1 = time.perf_counter_ns()
+                public_key = public.PrivateKey(private_key).public_key
+                t2 = time.perf_counter_ns()
+                public_b64 = base64.b64encode(bytes(public_key))
+                t3 = time.perf_counter_ns()
+                profiler.add(STAGE_ENTROPY, t1 - t0)
+                profiler.add(STAGE_SCALARMULT, t2 - t1)
+                profiler.add(STAGE_BASE64, t3 - t2)
+            else:
+                private_key = utils.random(32)
+                public_key = public.PrivateKey(private_key).public_key
+                public_b64 = base64.b64encode(bytes(public_key))
             
             keys_checked += 1
             
             # Обновление счетчика каждые 1000 ключей
             if keys_checked % 1000 == 0:
-                with counter.get_lock():
-                    counter.value += 1000
+                if profiler is not None:
+                    # Блокировка редкая, поэтому замеряем каждую
+                    t0 = time.perf_counter_ns()
+                    with counter.get_lock():
+                        counter.value += 1000
+                    profiler.add(STAGE_COUNTER, time.perf_counter_ns() - t0)
+                    profiler.flush()
+                else:
+                    with counter.get_lock():
+                        counter.value += 1000
             
             # Проверка на совпадение с любым префиксом
+            if sampled:
+                t0 = time.perf_counter_ns()
             public_str = public_b64.decode()
             
             if strict_mode:
@@ -140,6 +220,9 @@ def worker_process(worker_id: int, target_prefixes_list: List[bytes],
                         result_queue.put(result)
                         found_event.set()
                         return
+            
+            if sampled:
+                profiler.add(STAGE_PREFIX, time.perf_counter_ns() - t0)
     
     except Exception as e:
         print(f"[Worker {worker_id}] Ошибка: {e}")
@@ -147,6 +230,13 @@ def worker_process(worker_id: int, target_prefixes_list: List[bytes],
         # Добавить оставшиеся ключи в счетчик
         with counter.get_lock():
             counter.value += (keys_checked % 1000)
+        
+        if profiler is not None:
+            profiler.flush()
+        
+        if cprofile is not None:
+            cprofile.disable()
+            cprofile.dump_stats(os.path.join(profile_dump, f"worker_{worker_id}.prof"))
 
 class StatsMonitor:
     """Мониторинг статистики поиска"""
@@ -507,6 +597,51 @@ def print_result(result: dict, total_time: timedelta, total_keys: int):
         print(f"Средняя скорость: {total_keys / total_time.total_seconds():,.0f}/сек")
     print(f"{'='*60}\n")
 
+def print_profile(profile_stats: mp.Array, profile_every: int, profile_files: Optional[List[str]] = None):
+    """Вывод таблицы времени по стадиям горячего цикла"""
+    # Блокировка могла остаться захваченной принудительно завершенным процессом
+    lock = profile_stats.get_lock()
+    locked = lock.acquire(timeout=2)
+    try:
+        stats = list(profile_stats)
+    finally:
+        if locked:
+            lock.release()
+    
+    rows = []
+    for stage, name in enumerate(PROFILE_STAGES):
+        total_ns, samples = stats[stage * 2], stats[stage * 2 + 1]
+        # Каждый замер стадии ключа представляет profile_every ключей,
+        # блокировка счетчика замеряется при каждом обновлении
+        weight = 1 if stage == STAGE_COUNTER else profile_every
+        mean_ns = total_ns / samples if samples else 0
+        rows.append((name, samples, mean_ns, total_ns * weight))
+    
+    estimated_total = sum(row[3] for row in rows)
+    
+    print(f"\n{'='*60}")
+    print(f"⏱  ПРОФИЛЬ ГОРЯЧЕГО ЦИКЛА (замер каждого {profile_every}-го ключа)")
+    print(f"{'='*60}")
+    
+    if estimated_total == 0:
+        print("Недостаточно замеров для построения профиля")
+    else:
+        print(f"{'Стадия':<24} {'Замеров':>9} {'Среднее, нс':>12} {'Оценка, с':>10} {'Доля':>7}")
+        for name, samples, mean_ns, stage_ns in sorted(rows, key=lambda row: row[3], reverse=True):
+            share = stage_ns / estimated_total
+            print(f"{name:<24} {samples:>9,} {mean_ns:>12,.0f} {stage_ns / 1e9:>10.2f} {share:>6.1%} "
+                  f"{'█' * round(share * 30)}")
+    
+    if profile_files is not None:
+        if profile_files:
+            print(f"\ncProfile по процессам:")
+            for filename in profile_files:
+                print(f"  {filename}")
+            print(f"  (просмотр: python -m pstats <файл.prof>)")
+        else:
+            print(f"\n⚠️  cProfile-статистика не была сохранена ни одним процессом")
+    print(f"{'='*60}\n")
+
 def main():
     """Основная функция программы"""
     parser = argparse.ArgumentParser(
@@ -518,6 +653,7 @@ def main():
   python wg_vanity.py --word "my_prefix" --strict   # Строгий режим без замен
   python wg_vanity.py -w bitcoin --strict --workers 4
   python wg_vanity.py -w test --save
+  python wg_vanity.py -w test --profile --profile-every 100 --profile-dump prof
   
 При флаге --save создаются:
   1. wg_keys_log.txt - общий лог ВСЕХ найденных ключей (всех префиксов)
@@ -549,6 +685,12 @@ def main():
                        help='Количество рабочих процессов (по умолчанию - кол-во CPU)')
     parser.add_argument('-s', '--save', action='store_true',
                        help='Сохранять результаты в файлы (использует/создает config.ini)')
+    parser.add_argument('--profile', action='store_true',
+                       help='Профилирование стадий горячего цикла с таблицей при выходе')
+    parser.add_argument('--profile-every', type=int, default=1000,
+                       help='Замерять каждый N-й ключ в режиме --profile (по умолчанию 1000)')
+    parser.add_argument('--profile-dump', type=str, default=None,
+                       help='Каталог для сохранения cProfile-статистики каждого процесса')
     
     args = parser.parse_args()
     
@@ -558,6 +700,16 @@ def main():
         print("Ошибка: слово не может быть пустым!")
         sys.exit(1)
     
+    if args.profile_every < 1:
+        print("Ошибка: --profile-every должен быть не меньше 1!")
+        sys.exit(1)
+    
+    if args.profile_dump:
+        os.makedirs(args.profile_dump, exist_ok=True)
+        if args.profile:
+            print("⚠️  --profile-dump включает cProfile в том же цикле: "
+                  "время стадий в таблице --profile будет завышено")
+    
     # Запрашиваем данные сервера если нужно сохранять
     server_config = None
     if args.save:
@@ -587,12 +739,17 @@ def main():
         print(f"Сохранение:           ВКЛЮЧЕНО")
         print(f"Лог-файл:            wg_keys_log.txt (общий для всех префиксов)")
         print(f"Конфиг:              config.ini (загружены настройки сервера)")
+    if args.profile:
+        print(f"Профилирование:       ВКЛЮЧЕНО (каждый {args.profile_every}-й ключ)")
+    if args.profile_dump:
+        print(f"cProfile:             {args.profile_dump}/worker_<id>.prof")
     print(f"{'='*60}")
     print("Начинаю поиск... (Ctrl+C для остановки)\n")
     
     found_event = mp.Event()
     counter = mp.Value('Q', 0)
     result_queue = mp.Queue()
+    profile_stats = mp.Array('Q', len(PROFILE_STAGES) * 2) if args.profile else None
     start_time = datetime.now()
     
     processes = []
@@ -602,7 +759,8 @@ def main():
         for i in range(worker_count):
             process = mp.Process(
                 target=worker_process,
-                args=(i + 1, target_prefixes_list, found_event, counter, result_queue, args.strict),
+                args=(i + 1, target_prefixes_list, found_event, counter, result_queue, args.strict,
+                      profile_stats, args.profile_every, args.profile_dump),
                 daemon=False
             )
             processes.append(process)
@@ -624,6 +782,9 @@ def main():
         found_event.set()
         
         for process in processes:
+            if args.profile or args.profile_dump:
+                # Даем процессу сбросить замеры и записать cProfile
+                process.join(timeout=PROFILE_JOIN_TIMEOUT)
             if process.is_alive():
                 process.terminate()
                 process.join(timeout=1)
@@ -648,6 +809,20 @@ def main():
             if total_time.total_seconds() > 0:
                 print(f"Средняя скорость:   {total_keys / total_time.total_seconds():,.0f}/сек")
             print(f"{'='*60}\n")
+        
+        profile_files = None
+        if args.profile_dump:
+            # Только файлы, действительно записанные в этом запуске
+            profile_files = []
+            for i in range(worker_count):
+                filename = os.path.join(args.profile_dump, f"worker_{i + 1}.prof")
+                if os.path.exists(filename) and os.path.getmtime(filename) >= start_time.timestamp():
+                    profile_files.append(filename)
+        
+        if profile_stats is not None:
+            print_profile(profile_stats, args.profile_every, profile_files)
+        elif profile_files is not None:
+            print(f"cProfile-статистика: {', '.join(profile_files) if profile_files else 'не сохранена'}")
 
 if __name__ == "__main__":
     mp.freeze_support()